@@ -9,14 +9,54 @@ import os
 import json
 import argparse
 
+import orjson
+
 try:
     import networkx as nx
 except ImportError:
     raise ImportError("networkx is required to build the knowledge graph. Install with `pip install networkx`.")
 
 
-def build_graph(provenance: dict) -> nx.DiGraph:
+# Text attributes that can be large enough to bloat exported graphs
+LARGE_TEXT_ATTRS = ('task', 'plan', 'model_output', 'observations', 'action_output', 'value')
+TRUNCATION_MARKER = ' … [truncated]'
+
+# Shared fallback for calls without a 'function' entry, so misses don't allocate
+_EMPTY: dict = {}
+
+
+def build_graph(provenance: dict, max_attr_chars: int = None, payloads: dict = None) -> nx.DiGraph:
+    """
+    Build a knowledge graph from a provenance dict.
+
+    Args:
+        provenance: dict from proof_of_work JSON under 'provenance'.
+        max_attr_chars: if set, large text attributes are cut to this many characters.
+        payloads: optional dict receiving the full text of every truncated attribute
+            as payloads[node_id][attr].
+
+    Returns:
+        The knowledge graph as a NetworkX DiGraph.
+    """
     G = nx.DiGraph()
+    # Repeated strings (task text, step types, tool names) share one object
+    pool = {}
+
+    def intern(value):
+        return pool.setdefault(value, value) if isinstance(value, str) else value
+
+    def shrink_text_attrs(node_id, attrs):
+        for key in LARGE_TEXT_ATTRS:
+            val = attrs.get(key)
+            if not isinstance(val, str):
+                continue
+            if max_attr_chars is not None and len(val) > max_attr_chars:
+                if payloads is not None:
+                    payloads.setdefault(node_id, {})[key] = val
+                val = val[:max_attr_chars] + TRUNCATION_MARKER
+            attrs[key] = intern(val)
+        return attrs
+
     # Root agent
     root = provenance.get('root_agent', {})
     root_name = root.get('name', 'root')
@@ -35,7 +75,7 @@ def build_graph(provenance: dict) -> nx.DiGraph:
         prev_step = None
         for step in agent_info.get('steps', []):
             seq = step.get('sequence')
-            step_type = step.get('type', 'step')
+            step_type = intern(step.get('type', 'step'))
             step_id = f"{agent_id}:step:{seq}"
             # Build attributes, skipping None values
             attrs = {'type': step_type, 'sequence': seq}
@@ -43,7 +83,7 @@ def build_graph(provenance: dict) -> nx.DiGraph:
                 val = step.get(key)
                 if val is not None:
                     attrs[key] = val
-            G.add_node(step_id, **attrs)
+            G.add_node(step_id, **shrink_text_attrs(step_id, attrs))
             # Link agent to its first step
             G.add_edge(agent_id, step_id, relation='has_step')
             # Link sequential steps
@@ -52,21 +92,20 @@ def build_graph(provenance: dict) -> nx.DiGraph:
             prev_step = step_id
             # For action steps, link tool calls and observations
             if step_type == 'action':
+                # observations are per step, so look them up once for all calls
+                obs = step.get('observations')
+                obs_id = step_id + ':obs'
                 for call in step.get('tool_calls', []):
-                    func = call.get('function', {})
-                    tool_name = func.get('name')
+                    func = call.get('function') or _EMPTY
+                    tool_name = intern(func.get('name'))
                     tool_id = f"tool:{tool_name}"
                     G.add_node(tool_id, type='tool')
                     G.add_edge(step_id, tool_id, relation='calls_tool')
                     # link observations from tool
-                    obs = step.get('observations')
                     if obs is not None:
-                        obs_id = f"{step_id}:obs"
-                        G.add_node(obs_id, type='observation', value=obs)
+                        G.add_node(obs_id, **shrink_text_attrs(obs_id, {'type': 'observation', 'value': obs}))
                         G.add_edge(tool_id, obs_id, relation='produces')
-            # Final answer inside processing will be separate
-        # After steps, check for final answer node
-        # It may appear as its own step
+            # Final answers are recorded as their own 'final_answer' step nodes
 
     # Build graph for root agent
     add_agent_steps(root, root_id)
@@ -86,13 +125,6 @@ def build_graph(provenance: dict) -> nx.DiGraph:
         # Link management
         G.add_edge(root_id, ma_id, relation='manages')
         add_agent_steps(ma, ma_id)
-
-    # Finally, attach final answers if any
-    # Search for final_answer steps across all agents
-    for node, data in list(G.nodes(data=True)):
-        if isinstance(data.get('type'), str) and data.get('type') == 'final_answer':
-            # Already a step node with final_answer attribute
-            continue
     return G
 
 
@@ -133,8 +165,8 @@ def main():
     elif fmt == 'json':
         from networkx.readwrite import json_graph
         data = json_graph.node_link_data(G)
-        with open(out_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        with open(out_path, 'wb') as f:
+            f.write(orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2))
     else:
         raise ValueError(f"Unsupported format: {fmt}")
     print(f'Knowledge graph saved to {out_path} ({fmt})')
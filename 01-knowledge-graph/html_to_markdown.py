@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+html_to_markdown.py
+
+Lightweight HTML to Markdown conversion for the agent's webpage tools.
+Parses with selectolax's Lexbor (C) parser and only gives Markdown syntax to
+headings, paragraphs, links, list items and code; everything else becomes
+plain text, which is all the agent needs to read a page.
+"""
+import re
+from itertools import groupby
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    raise ImportError("selectolax is required to convert webpages. Install with `pip install selectolax`.")
+
+# Documents longer than this are cut at a paragraph boundary before parsing
+MAX_HTML_CHARS = 2_000_000
+
+# Page chrome and non-content elements removed before conversion. <form> and
+# <header> are kept: forms wrap whole pages on some sites (e.g. ASP.NET) and
+# headers often hold an article's title
+SKIP_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'iframe',
+             'nav', 'footer', 'aside']
+
+# Site banners: only a <header> directly under <body> is dropped
+SKIP_SELECTOR = 'body > header'
+
+# Elements rendered as separate blocks of text
+BLOCK_TAGS = frozenset({'p', 'div', 'section', 'article', 'main', 'blockquote', 'table',
+                        'ul', 'ol', 'dl', 'dt', 'dd', 'figure', 'figcaption', 'hr'})
+
+# Table cells; each row becomes one '| a | b |' line
+CELL_TAGS = frozenset({'td', 'th'})
+
+HEADING_PREFIXES = {f'h{level}': '#' * level + ' ' for level in range(1, 7)}
+
+_WHITESPACE = re.compile(r'\s+')
+_MULTI_SPACE = re.compile(r' {2,}')
+_SPACE_AROUND_NL = re.compile(r' *\n *')
+_MULTI_NL = re.compile(r'\n{3,}')
+_BLANK_LINES = re.compile(r'\n\s*\n')
+_TRAILING_SPACE = re.compile(r' +\n')
+
+
+class _Verbatim(str):
+    """Already-formatted text (<pre> blocks, list items) exempt from whitespace cleanup."""
+
+
+def _inline_text(node) -> str:
+    return _WHITESPACE.sub(' ', node.text(deep=True)).strip()
+
+
+def _emit(node, out: list) -> None:
+    for child in node.iter(include_text=True):
+        tag = child.tag
+        if tag == '-text':
+            out.append(_WHITESPACE.sub(' ', child.text_content))
+        elif tag.startswith('-'):
+            # comments, doctype and other non-element nodes
+            continue
+        elif tag in HEADING_PREFIXES:
+            out.append(f"\n\n{HEADING_PREFIXES[tag]}{_inline_text(child)}\n\n")
+        elif tag == 'a':
+            text = _inline_text(child)
+            href = child.attributes.get('href')
+            out.append(f"[{text}]({href})" if text and href else text)
+        elif tag == 'li':
+            # render the item on its own, then indent any nested lines under the bullet
+            item_parts = []
+            _emit(child, item_parts)
+            item = _BLANK_LINES.sub('\n', _join(item_parts).strip())
+            out.append(_Verbatim('\n- ' + item.replace('\n', '\n  ')))
+        elif tag == 'pre':
+            out.append('\n\n```\n')
+            out.append(_Verbatim(child.text(deep=True).strip('\n')))
+            out.append('\n```\n\n')
+        elif tag == 'code':
+            out.append(f"`{child.text(deep=True)}`")
+        elif tag == 'br':
+            out.append('\n')
+        elif tag == 'tr':
+            out.append('\n|')
+            _emit(child, out)
+        elif tag in CELL_TAGS:
+            out.append(' ')
+            _emit(child, out)
+            out.append(' |')
+        elif tag in BLOCK_TAGS:
+            out.append('\n\n')
+            _emit(child, out)
+            out.append('\n\n')
+        else:
+            _emit(child, out)
+
+
+def _clean(text: str) -> str:
+    text = _MULTI_SPACE.sub(' ', text)
+    text = _SPACE_AROUND_NL.sub('\n', text)
+    return _MULTI_NL.sub('\n\n', text)
+
+
+def _join(parts: list) -> str:
+    # Verbatim parts are joined untouched; everything else gets whitespace cleanup
+    return ''.join(
+        ''.join(group) if verbatim else _clean(''.join(group))
+        for verbatim, group in groupby(parts, key=lambda part: isinstance(part, _Verbatim))
+    )
+
+
+def html_to_markdown(html: str) -> str:
+    """
+    Convert an HTML document to compact Markdown.
+
+    Args:
+        html: The HTML source of the page.
+
+    Returns:
+        Markdown text with runs of blank lines collapsed.
+    """
+    if len(html) > MAX_HTML_CHARS:
+        cut = html.rfind('</p>', 0, MAX_HTML_CHARS)
+        html = html[:cut + len('</p>')] if cut != -1 else html[:MAX_HTML_CHARS]
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(SKIP_TAGS)
+    for node in tree.css(SKIP_SELECTOR):
+        node.decompose()
+    root = tree.body or tree.root
+    if root is None:
+        return ''
+    parts = []
+    try:
+        _emit(root, parts)
+    except RecursionError:
+        # pathologically nested markup: fall back to the plain text
+        parts = [_WHITESPACE.sub(' ', root.text(separator=' '))]
+    text = _TRAILING_SPACE.sub('\n', _join(parts))
+    return _MULTI_NL.sub('\n\n', text).strip()
@@ -2,15 +2,75 @@ import os
 import requests
 import xml.etree.ElementTree as ET
 import json
-import re
+import time
 from smolagents import CodeAgent, tool, LiteLLMModel
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
+from urllib3.util.retry import Retry
 from datetime import date
-from proof_of_work import save_proof_of_work
+from concurrent.futures import ThreadPoolExecutor, wait
+from html_to_markdown import html_to_markdown
+from prompt_toolkit import PromptSession
+from prompt_toolkit.patch_stdout import patch_stdout
+from proof_of_work import start_proof_log
 
 load_dotenv()
 
+# Upper bound on concurrent requests issued by visit_webpages
+MAX_PARALLEL_FETCHES = 8
+
+# One pooled session for all fetches so repeat visits to a host reuse the
+# TCP/TLS connection; transient failures are retried with backoff
+FETCH_TIMEOUT = (3, 30)  # (connect, read) seconds
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64,
+                       max_retries=Retry(total=3, backoff_factor=0.3))
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
+# Converted pages keyed by URL; kept at module scope so they survive across tasks.
+# Entries are served as-is for PAGE_CACHE_TTL seconds, then revalidated with a
+# conditional GET so an unchanged page costs a 304 and no re-conversion.
+PAGE_CACHE_TTL = 24 * 60 * 60
+_page_cache = {}
+
+
+def fetch_markdown(url: str) -> str:
+    """Fetch a webpage and convert it to Markdown, returning an error message on failure."""
+    cached = _page_cache.get(url)
+    if cached and time.time() - cached['fetched_at'] < PAGE_CACHE_TTL:
+        return cached['markdown']
+    try:
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        # Send a GET request to the URL
+        response = _session.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+        if cached and response.status_code == 304:
+            cached['fetched_at'] = time.time()
+            return cached['markdown']
+        response.raise_for_status()  # Raise an exception for bad status codes
+
+        # Convert the HTML content to Markdown (also collapses multiple line breaks)
+        markdown_content = html_to_markdown(response.text)
+
+        _page_cache[url] = {
+            'fetched_at': time.time(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'markdown': markdown_content,
+        }
+        return markdown_content
+
+    except RequestException as e:
+        return f"Error fetching the webpage: {str(e)}"
+    except Exception as e:
+        return f"An unexpected error occurred: {str(e)}"
+
 
 @tool
 def visit_webpage(url: str) -> str:
@@ -22,25 +82,27 @@ def visit_webpage(url: str) -> str:
     Returns:
         The content of the webpage converted to Markdown, or an error message if the request fails.
     """
-    try:
-        # Send a GET request to the URL
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for bad status codes
+    return fetch_markdown(url)
 
-        # Convert the HTML content to Markdown - assuming a markdownify function exists
-        # You'll need to add the import for markdownify or implement the conversion
-        from markdownify import markdownify
-        markdown_content = markdownify(response.text).strip()
 
-        # Remove multiple line breaks
-        markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content)
+@tool
+def visit_webpages(urls: list[str]) -> str:
+    """Visits several webpages concurrently and returns their contents as markdown.
+    Prefer this over repeated visit_webpage calls when you already know all the URLs.
 
-        return markdown_content
+    Args:
+        urls: The URLs of the webpages to visit.
 
-    except RequestException as e:
-        return f"Error fetching the webpage: {str(e)}"
-    except Exception as e:
-        return f"An unexpected error occurred: {str(e)}"
+    Returns:
+        The content of each webpage converted to Markdown, each preceded by a header with its URL.
+    """
+    if not urls:
+        return ""
+    # Fetches are network-bound, so overlapping them brings the total latency
+    # down to roughly that of the slowest page
+    with ThreadPoolExecutor(max_workers=min(len(urls), MAX_PARALLEL_FETCHES)) as pool:
+        pages = list(pool.map(fetch_markdown, urls))
+    return "\n\n".join(f"## {url}\n\n{page}" for url, page in zip(urls, pages))
 
 @tool
 def create_file(path: str, content: str) -> str:
@@ -64,38 +126,86 @@ def create_file(path: str, content: str) -> str:
     except Exception as e:
         return f"Error creating file: {e}"
 
+def cancel_tasks(agent, futures):
+    """Drop queued tasks and ask the agent to stop the run in progress."""
+    cancelled = sum(future.cancel() for future in futures)
+    if any(future.running() for future in futures):
+        agent.interrupt()
+        print("Interrupting the current task...")
+    if cancelled:
+        print(f"Cancelled {cancelled} queued task(s)")
+
+
+def wait_for_tasks(agent, futures):
+    """Block until outstanding tasks finish; Ctrl-C cancels them instead of waiting."""
+    remaining = [future for future in futures if not future.done()]
+    if not remaining:
+        return
+    print(f"Waiting for {len(remaining)} pending task(s)... (Ctrl-C to cancel)")
+    try:
+        wait(remaining)
+    except KeyboardInterrupt:
+        cancel_tasks(agent, remaining)
+        # the running task stops at its next step once interrupted
+        wait(remaining)
+
+
 # -----------------------------------------------------------------------------
 # Main Agent Workflow
 # -----------------------------------------------------------------------------
 def main():
 
     # Set up the tools list for the agent.
-    tools = [visit_webpage, create_file]
+    tools = [visit_webpage, visit_webpages, create_file]
     
     # Initialize the agent with the chosen tools and a basic model.
     #model = HfApiModel()
     model = LiteLLMModel(model_id="anthropic/claude-3-7-sonnet-latest")
 
+    # Tool calls are appended to a JSONL file after every step, so nothing is
+    # held back for the end of the session and a crash keeps what was logged
+    proof_path, log_step, close_proof_log = start_proof_log(output_dir='./output')
+
     agent = CodeAgent(
         tools=tools,
         model=model,
         add_base_tools=True,
         additional_authorized_imports=["time", "json", "pydoc", "watchdog"],
-        max_steps=100
+        max_steps=100,
+        step_callbacks=[log_step]
     )
     
-    # Interactive REPL via manager
-    while True:
-        task = input("\nEnter task (or 'exit' to quit): ")
-        if task.lower() in ['exit', 'quit']:
-            break
+    def run_task(task):
         try:
             result = agent.run(task)
             print("\nManager response:\n", result)
         except Exception as e:
             print(f"Error: {e}")
-    
-    saved_path = save_proof_of_work(agent, output_dir='./output')
-    print(f"Proof of work written to {saved_path}")
+
+    # Interactive REPL via manager
+    # Tasks run one at a time on a worker thread so the prompt stays usable while
+    # the agent works: new tasks queue up behind the current one, Ctrl-C cancels
+    # queued tasks and interrupts the running one, and 'exit' waits for the queue
+    # (Ctrl-C during that wait cancels it).
+    session = PromptSession()
+    pending = []
+    try:
+        with ThreadPoolExecutor(max_workers=1) as worker, patch_stdout():
+            while True:
+                try:
+                    task = session.prompt("\nEnter task (or 'exit' to quit): ")
+                except KeyboardInterrupt:
+                    cancel_tasks(agent, pending)
+                    continue
+                except EOFError:
+                    break
+                if task.lower() in ['exit', 'quit']:
+                    break
+                pending = [future for future in pending if not future.done()]
+                pending.append(worker.submit(run_task, task))
+            wait_for_tasks(agent, pending)
+    finally:
+        close_proof_log()
+    print(f"Proof of work written to {proof_path}")
 if __name__ == '__main__':
     main()
\ No newline at end of file
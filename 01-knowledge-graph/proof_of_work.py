@@ -1,7 +1,10 @@
 import os
-import json
+import queue
+import threading
 from datetime import datetime
 
+import orjson
+
 def extract_tool_calls(agent):
     """
     Extract tool calls from an agent's memory steps.
@@ -21,17 +24,9 @@ def extract_tool_calls(agent):
     elif hasattr(memory, 'get_full_steps'):
         steps = memory.get_full_steps()
     else:
-        steps = []
-        for step in getattr(memory, 'steps', []):
-            if hasattr(step, 'dict'):
-                steps.append(step.dict())
-    # Collect tool_calls
-    calls = []
-    for step in steps:
-        tool_calls = step.get('tool_calls') or []
-        for call in tool_calls:
-            calls.append(call)
-    return calls
+        steps = [step.dict() for step in getattr(memory, 'steps', []) if hasattr(step, 'dict')]
+    # Collect tool_calls in a single flattening comprehension
+    return [call for step in steps for call in (step.get('tool_calls') or ())]
 
 def save_proof_of_work(agent, output_dir='output', prefix='proof_of_work'):
     """
@@ -50,6 +45,57 @@ def save_proof_of_work(agent, output_dir='output', prefix='proof_of_work'):
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     filename = f"{prefix}_{timestamp}.json"
     filepath = os.path.join(output_dir, filename)
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(calls, f, indent=2)
+    # orjson writes bytes directly and handles datetimes natively; anything it
+    # cannot serialize (e.g. smolagents memory objects) falls back to str()
+    with open(filepath, 'wb') as f:
+        f.write(orjson.dumps(
+            calls,
+            default=str,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY,
+        ))
     return filepath
+
+def start_proof_log(output_dir='output', prefix='proof_of_work'):
+    """
+    Stream tool calls to a JSONL file as the agent makes them, one call per line.
+
+    Lines are appended from a background thread, so disk writes never stall the
+    agent loop, and a crash loses at most the calls still queued.
+
+    Args:
+        output_dir: Directory path to save the output file (will be created if not exists).
+        prefix: Filename prefix for the proof of work file.
+
+    Returns:
+        The path to the JSONL file, a step callback to pass to the agent's
+        step_callbacks, and a close() function that flushes and stops the writer.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filepath = os.path.join(output_dir, f"{prefix}_{timestamp}.jsonl")
+    lines = queue.Queue()
+
+    def drain():
+        with open(filepath, 'ab') as f:
+            while True:
+                line = lines.get()
+                if line is None:
+                    break
+                f.write(line)
+                # flush once per burst rather than once per line
+                if lines.empty():
+                    f.flush()
+
+    writer = threading.Thread(target=drain, name='proof-writer', daemon=True)
+    writer.start()
+
+    def on_step(step, agent=None):
+        for call in getattr(step, 'tool_calls', None) or ():
+            call = call.dict() if hasattr(call, 'dict') else call
+            lines.put(orjson.dumps(call, default=str, option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY) + b"\n")
+
+    def close():
+        lines.put(None)
+        writer.join()
+
+    return filepath, on_step, close
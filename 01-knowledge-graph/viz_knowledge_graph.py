@@ -14,15 +14,87 @@ import os
 import json
 import argparse
 
-
+import orjson
 import networkx as nx
 try:
     from pyvis.network import Network
 except ImportError:
     raise ImportError("pyvis is required to run this script: pip install pyvis")
+try:
+    import igraph
+except ImportError:
+    # Optional: igraph's C layout is much faster on large graphs; fall back to NetworkX
+    igraph = None
 
 from build_knowledge_graph import build_graph
 
+# Longer node attributes are truncated in the graph data; the full text is kept
+# in a separate JSON block on the page
+MAX_ATTR_CHARS = 2048
+
+# Appended to the PyVis page: the full text sits in a non-executed JSON script
+# block that is only parsed on the first node click, so page load skips it.
+# Embedding (rather than fetching a file) keeps it working from file:// pages.
+PAYLOAD_LOADER = """
+<script type="application/json" id="payload-data">PAYLOAD_JSON</script>
+<pre id="payload-view" style="display: none; position: fixed; right: 0; bottom: 0; width: 40%;
+  max-height: 50%; overflow: auto; margin: 0; padding: 8px; background: #f9f9f9;
+  border: 1px solid #ccc; white-space: pre-wrap;"></pre>
+<script>
+  var payloadView = document.getElementById('payload-view');
+  var payloads = null;
+  network.on('click', function(params) {
+    if (!params.nodes.length) {
+      payloadView.style.display = 'none';
+      return;
+    }
+    payloads = payloads || JSON.parse(document.getElementById('payload-data').textContent);
+    var full = payloads[params.nodes[0]];
+    if (!full) {
+      payloadView.style.display = 'none';
+      return;
+    }
+    payloadView.textContent = Object.keys(full).map(function(k) { return k + ':\\n' + full[k]; }).join('\\n\\n');
+    payloadView.style.display = 'block';
+  });
+</script>
+"""
+
+# Positions are computed here and scaled to [-LAYOUT_SCALE, LAYOUT_SCALE] pixels
+LAYOUT_SCALE = 1000
+
+# Nodes arrive pre-positioned, so the browser never runs the physics solver
+VIS_OPTIONS = {
+    'physics': {'enabled': False},
+    'interaction': {'hideEdgesOnDrag': True},
+    'nodes': {'shape': 'dot'},
+    'edges': {'smooth': False},
+}
+
+
+def compute_layout(G: nx.DiGraph, scale: float = LAYOUT_SCALE) -> dict:
+    """
+    Compute a force-directed layout for G.
+
+    Returns:
+        Dict mapping each node id to an (x, y) tuple within [-scale, scale].
+    """
+    if len(G) == 0:
+        return {}
+    if igraph is not None:
+        ig = igraph.Graph.from_networkx(G)
+        pos = dict(zip(ig.vs['_nx_name'], ig.layout_fruchterman_reingold().coords))
+    else:
+        pos = nx.spring_layout(G, seed=42)
+    # Center and rescale so both backends produce the same pixel range
+    xs = [p[0] for p in pos.values()]
+    ys = [p[1] for p in pos.values()]
+    cx = (max(xs) + min(xs)) / 2
+    cy = (max(ys) + min(ys)) / 2
+    half_span = max(max(xs) - min(xs), max(ys) - min(ys)) / 2 or 1
+    factor = scale / half_span
+    return {n: ((x - cx) * factor, (y - cy) * factor) for n, (x, y) in pos.items()}
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -44,8 +116,9 @@ def main():
         data = json.load(f)
     provenance = data.get('provenance', {})
 
-    # Build NetworkX graph
-    G = build_graph(provenance)
+    # Build NetworkX graph, keeping full text of truncated attributes aside
+    payloads = {}
+    G = build_graph(provenance, max_attr_chars=MAX_ATTR_CHARS, payloads=payloads)
 
     # Initialize PyVis network
     net = Network(
@@ -56,11 +129,25 @@ def main():
     # Transfer nodes & edges
     net.from_nx(G)
 
+    # Pin every node at its precomputed position
+    pos = compute_layout(G)
+    for node in net.nodes:
+        node['x'], node['y'] = pos[node['id']]
+        node['physics'] = False
+        node['fixed'] = True
+    net.set_options(json.dumps(VIS_OPTIONS))
+
     # Determine output HTML path
     base = os.path.splitext(args.input_json)[0]
     out_file = args.output or f"{base}.html"
     # Generate and save HTML (use write_html directly to avoid notebook template issues)
     net.write_html(out_file, open_browser=False, notebook=False)
+    if payloads:
+        # '</' is escaped so no attribute text can close the script block early
+        payload_json = orjson.dumps(payloads, default=str).replace(b'</', b'<\\/').decode('utf-8')
+        loader = PAYLOAD_LOADER.replace('PAYLOAD_JSON', payload_json, 1)
+        with open(out_file, 'w', encoding='utf-8') as f:
+            f.write(net.html.replace('</body>', loader + '</body>', 1))
     print(f"Interactive visualization written to {out_file}")
 
 
@@ -8,110 +8,238 @@ steps, tool calls, observations, and final answers. Exports the graph in GEXF fo
 import os
 import json
 import argparse
+import warnings
+from itertools import chain
+from typing import List, Union
+from xml.sax.saxutils import XMLGenerator
+
+import orjson
+
+from step_record import AgentRecord, as_agents
 
 try:
     import networkx as nx
+    from networkx.readwrite import json_graph
 except ImportError:
     raise ImportError("networkx is required to build the knowledge graph. Install with `pip install networkx`.")
 
+# Key for the edge list in node-link JSON, matching what the installed networkx's
+# node_link_data writes and node_link_graph reads by default: 'links' before 3.6,
+# 'edges' from 3.6 on
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', FutureWarning)
+    _NODE_LINK_EDGES_KEY = 'edges' if 'edges' in json_graph.node_link_data(nx.DiGraph()) else 'links'
 
-def build_graph(provenance: dict) -> nx.DiGraph:
-    G = nx.DiGraph()
-    # Root agent
-    root = provenance.get('root_agent', {})
-    root_name = root.get('name', 'root')
-    root_id = f"agent:{root_name}"
-    # Filter out None values in attributes
-    root_attrs = {
-        'type': 'agent',
-        'class_name': root.get('class'),
-        'model': root.get('model'),
-    }
-    root_attrs = {k: v for k, v in root_attrs.items() if v is not None}
-    G.add_node(root_id, **root_attrs)
+# Optional step fields copied onto step nodes when present
+STEP_ATTRS = ('task', 'plan', 'model_output', 'observations', 'action_output', 'duration')
+
+
+def _agent_attrs(agent: AgentRecord) -> dict:
+    # Skip None values so they never reach the graph attributes
+    attrs = {'type': 'agent'}
+    if agent.class_name is not None:
+        attrs['class_name'] = agent.class_name
+    if agent.model is not None:
+        attrs['model'] = agent.model
+    return attrs
+
+
+def collect_graph_elements(provenance: Union[dict, List[AgentRecord]]):
+    """
+    Walk the provenance once and collect graph nodes and edges as plain lists.
+
+    Args:
+        provenance: dict from proof_of_work JSON under 'provenance', or the
+            agent records already parsed from it by step_record.load_agents.
+
+    Returns:
+        nodes: list of (node_id, attrs) tuples, in insertion order.
+        edges: list of (source_id, target_id, attrs) tuples.
+    """
+    nodes = []
+    edges = []
+    seen_tools = set()
+    add_node = nodes.append
+    add_edge = edges.append
 
     # Helper to add agent steps
-    def add_agent_steps(agent_info, agent_id):
+    def add_agent_steps(agent, agent_id):
         prev_step = None
-        for step in agent_info.get('steps', []):
-            seq = step.get('sequence')
-            step_type = step.get('type', 'step')
+        for step in agent.steps:
+            seq, step_type, tool_calls = step.sequence, step.type or 'step', step.tool_calls
             step_id = f"{agent_id}:step:{seq}"
             # Build attributes, skipping None values
             attrs = {'type': step_type, 'sequence': seq}
-            for key in ('task', 'plan', 'model_output', 'observations', 'action_output', 'duration'):
-                val = step.get(key)
+            for key in STEP_ATTRS:
+                val = getattr(step, key)
                 if val is not None:
                     attrs[key] = val
-            G.add_node(step_id, **attrs)
+            add_node((step_id, attrs))
             # Link agent to its first step
-            G.add_edge(agent_id, step_id, relation='has_step')
+            add_edge((agent_id, step_id, {'relation': 'has_step'}))
             # Link sequential steps
             if prev_step:
-                G.add_edge(prev_step, step_id, relation='next_step')
+                add_edge((prev_step, step_id, {'relation': 'next_step'}))
             prev_step = step_id
             # For action steps, create a distinct node per tool invocation
             if step_type == 'action':
-                for idx, call in enumerate(step.get('tool_calls', [])):
-                    func = call.get('function', {})
-                    tool_name = func.get('name')
+                call_prefix = step_id + ':tool_call:'
+                for idx, call in enumerate(tool_calls):
+                    tool_name = call.function.name
                     # create a unique node for this tool call and capture details
-                    call_id = f"{step_id}:tool_call:{idx}"
+                    call_id = call_prefix + str(idx)
                     call_attrs = {'type': 'tool_call', 'tool': tool_name}
                     # capture code or arguments of the call
-                    if 'arguments' in func and func['arguments'] is not None:
-                        call_attrs['arguments'] = func['arguments']
+                    if call.function.arguments is not None:
+                        call_attrs['arguments'] = call.function.arguments
                     # attach explicit call output/result
-                    obs = None
-                    if 'output' in call and call['output'] is not None:
-                        obs = call['output']
-                    elif 'result' in call and call['result'] is not None:
-                        obs = call['result']
+                    obs = call.output
                     # fallback: if exactly one call in step, use step observations
-                    elif len(step.get('tool_calls', [])) == 1 and step.get('observations') is not None:
-                        obs = step.get('observations')
+                    if obs is None and len(tool_calls) == 1:
+                        obs = step.observations
                     if obs is not None:
                         call_attrs['observations'] = obs
-                    G.add_node(call_id, **call_attrs)
+                    add_node((call_id, call_attrs))
                     # link step to this specific call
-                    G.add_edge(step_id, call_id, relation='calls_tool')
+                    add_edge((step_id, call_id, {'relation': 'calls_tool'}))
                     # link this call to the generic tool node (skip python interpreter)
                     if tool_name != 'python_interpreter':
                         tool_id = f"tool:{tool_name}"
-                        G.add_node(tool_id, type='tool')
-                        G.add_edge(call_id, tool_id, relation='uses_tool')
-            # Final answer inside processing will be separate
-        # After steps, check for final answer node
-        # It may appear as its own step
-
-    # Build graph for root agent
-    add_agent_steps(root, root_id)
-
-    # Managed agents
-    for ma in provenance.get('managed_agents', {}).values():
-        ma_name = ma.get('name')
-        ma_id = f"agent:{ma_name}"
-        # Filter out None values in attributes
-        ma_attrs = {
-            'type': 'agent',
-            'class_name': ma.get('class'),
-            'model': ma.get('model'),
-        }
-        ma_attrs = {k: v for k, v in ma_attrs.items() if v is not None}
-        G.add_node(ma_id, **ma_attrs)
-        # Link management
-        G.add_edge(root_id, ma_id, relation='manages')
-        add_agent_steps(ma, ma_id)
-
-    # Finally, attach final answers if any
-    # Search for final_answer steps across all agents
-    for node, data in list(G.nodes(data=True)):
-        if isinstance(data.get('type'), str) and data.get('type') == 'final_answer':
-            # Already a step node with final_answer attribute
-            continue
+                        if tool_id not in seen_tools:
+                            seen_tools.add(tool_id)
+                            add_node((tool_id, {'type': 'tool'}))
+                        add_edge((call_id, tool_id, {'relation': 'uses_tool'}))
+            # Final answers are recorded as their own 'final_answer' step nodes
+
+    # Root agent first, then managed agents linked from it, in a single pass
+    root, *managed = as_agents(provenance)
+    root_id = f"agent:{root.name}"
+    for agent in chain([root], managed):
+        agent_id = f"agent:{agent.name}"
+        add_node((agent_id, _agent_attrs(agent)))
+        if agent is not root:
+            # Link management
+            add_edge((root_id, agent_id, {'relation': 'manages'}))
+        add_agent_steps(agent, agent_id)
+
+    return nodes, edges
+
+
+def _merge_elements(nodes, edges):
+    # Collapse repeated node ids / edge endpoints the way nx.DiGraph would,
+    # later attributes updating earlier ones
+    merged_nodes = {}
+    for node_id, attrs in nodes:
+        merged_nodes.setdefault(node_id, {}).update(attrs)
+    merged_edges = {}
+    for u, v, attrs in edges:
+        merged_edges.setdefault((u, v), {}).update(attrs)
+    return merged_nodes, merged_edges
+
+
+def _gexf_type(value) -> str:
+    # bool must be checked before int since it is a subclass
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'long'
+    if isinstance(value, float):
+        return 'double'
+    return 'string'
+
+
+def _gexf_attributes(elements) -> dict:
+    # Map each attribute key to (id, type); keys with mixed types fall back to string
+    types = {}
+    for attrs in elements:
+        for key, val in attrs.items():
+            t = _gexf_type(val)
+            if types.setdefault(key, t) != t:
+                types[key] = 'string'
+    return {key: (str(i), t) for i, (key, t) in enumerate(types.items())}
+
+
+def _gexf_value(value, attr_type: str) -> str:
+    if attr_type == 'boolean':
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def write_gexf(nodes, edges, path: str) -> None:
+    """
+    Stream graph elements from collect_graph_elements to a GEXF 1.2 file.
+
+    Writes elements directly instead of going through nx.write_gexf, which
+    builds a DiGraph plus a full XML tree and re-infers every attribute type.
+    """
+    nodes, edges = _merge_elements(nodes, edges)
+    node_attrs = _gexf_attributes(nodes.values())
+    edge_attrs = _gexf_attributes(edges.values())
+
+    def write_attvalues(attrs, declared):
+        if not attrs:
+            return
+        out.startElement('attvalues', {})
+        for key, val in attrs.items():
+            attr_id, attr_type = declared[key]
+            out.startElement('attvalue', {'for': attr_id, 'value': _gexf_value(val, attr_type)})
+            out.endElement('attvalue')
+        out.endElement('attvalues')
+
+    with open(path, 'w', encoding='utf-8') as f:
+        out = XMLGenerator(f, encoding='utf-8', short_empty_elements=True)
+        out.startDocument()
+        out.startElement('gexf', {'xmlns': 'http://www.gexf.net/1.2draft', 'version': '1.2'})
+        out.startElement('graph', {'defaultedgetype': 'directed', 'mode': 'static'})
+        for cls, declared in (('node', node_attrs), ('edge', edge_attrs)):
+            out.startElement('attributes', {'class': cls, 'mode': 'static'})
+            for key, (attr_id, attr_type) in declared.items():
+                out.startElement('attribute', {'id': attr_id, 'title': key, 'type': attr_type})
+                out.endElement('attribute')
+            out.endElement('attributes')
+        out.startElement('nodes', {})
+        for node_id, attrs in nodes.items():
+            out.startElement('node', {'id': node_id, 'label': node_id})
+            write_attvalues(attrs, node_attrs)
+            out.endElement('node')
+        out.endElement('nodes')
+        out.startElement('edges', {})
+        for idx, ((u, v), attrs) in enumerate(edges.items()):
+            out.startElement('edge', {'id': str(idx), 'source': u, 'target': v})
+            write_attvalues(attrs, edge_attrs)
+            out.endElement('edge')
+        out.endElement('edges')
+        out.endElement('graph')
+        out.endElement('gexf')
+        out.endDocument()
+
+
+def write_node_link_json(nodes, edges, path: str) -> None:
+    """Write graph elements in NetworkX node-link JSON form without building a DiGraph."""
+    nodes, edges = _merge_elements(nodes, edges)
+    data = {
+        'directed': True,
+        'multigraph': False,
+        'graph': {},
+        'nodes': [{**attrs, 'id': node_id} for node_id, attrs in nodes.items()],
+        _NODE_LINK_EDGES_KEY: [{**attrs, 'source': u, 'target': v} for (u, v), attrs in edges.items()],
+    }
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2))
+
+
+def graph_from_elements(nodes, edges) -> nx.DiGraph:
+    # Bulk-insert so NetworkX handles the whole batch in one call each
+    G = nx.DiGraph()
+    G.add_nodes_from(nodes)
+    G.add_edges_from(edges)
     return G
 
 
+def build_graph(provenance: Union[dict, List[AgentRecord]]) -> nx.DiGraph:
+    return graph_from_elements(*collect_graph_elements(provenance))
+
+
 def main():
     parser = argparse.ArgumentParser(description='Build a knowledge graph from proof_of_work JSON.')
     parser.add_argument('input_json', help='Path to proof_of_work JSON file')
@@ -125,8 +253,8 @@ def main():
         data = json.load(f)
     provenance = data.get('provenance', {})
 
-    # Build graph
-    G = build_graph(provenance)
+    # Collect graph elements; only GraphML export needs an in-memory DiGraph
+    nodes, edges = collect_graph_elements(provenance)
 
     # Determine output format and path
     base = os.path.splitext(args.input_json)[0]
@@ -143,14 +271,11 @@ def main():
 
     # Write graph in chosen format
     if fmt == 'gexf':
-        nx.write_gexf(G, out_path)
+        write_gexf(nodes, edges, out_path)
     elif fmt == 'graphml':
-        nx.write_graphml(G, out_path)
+        nx.write_graphml(graph_from_elements(nodes, edges), out_path)
     elif fmt == 'json':
-        from networkx.readwrite import json_graph
-        data = json_graph.node_link_data(G)
-        with open(out_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        write_node_link_json(nodes, edges, out_path)
     else:
         raise ValueError(f"Unsupported format: {fmt}")
     print(f'Knowledge graph saved to {out_path} ({fmt})')
@@ -5,119 +5,86 @@ build_timeline_data.py
 Convert a provenance dictionary into groups and items suitable
 for a vis-timeline swimlane view.
 """
-from typing import Dict, List, Tuple
-from datetime import datetime
-import json
+from typing import Dict, Iterator, List, Tuple, Union
 
-def build_timeline_data(provenance: Dict) -> Tuple[List[Dict], List[Dict]]:
+import orjson
+
+from step_record import AgentRecord, as_agents
+
+
+def _iter_agents(provenance: Union[Dict, List[AgentRecord]]) -> Iterator[AgentRecord]:
+    # Root agent first, then named managed agents, so both share one code path
+    root, *managed = as_agents(provenance)
+    yield root
+    yield from (agent for agent in managed if agent.name)
+
+
+def build_timeline_data(provenance: Union[Dict, List[AgentRecord]]) -> Tuple[List[Dict], List[Dict]]:
     """
     Build groups and items for a timeline visualization.
 
     Args:
-        provenance: dict from proof_of_work JSON under 'provenance'.
+        provenance: dict from proof_of_work JSON under 'provenance', or the
+            agent records already parsed from it by step_record.load_agents.
 
     Returns:
         groups: list of dicts with keys 'id' and 'content' for each agent.
         items: list of dicts with keys 'id', 'group', 'content', 'start'.
+            Times are epoch milliseconds, which vis-timeline accepts directly.
     """
     groups = []
     items: List[Dict] = []
-    # Root agent with nested step subgroups
-    root = provenance.get('root_agent', {})
-    root_name = root.get('name', 'root')
-    root_group: Dict = {'id': root_name, 'content': root_name, 'nestedGroups': []}
-    groups.append(root_group)
-    # Steps for root agent
-    for step in root.get('steps', []):
-        seq = step.get('sequence')
-        step_type = step.get('type', '')
-        start = step.get('start_time')
-        end = step.get('end_time')
-        if start is None:
-            continue
-        # define subgroup for this step
-        step_id = f"{root_name}-step-{seq}"
-        root_group['nestedGroups'].append(step_id)
-        groups.append({'id': step_id, 'content': f"Step {seq}: {step_type}"})
-        # format times
-        start_str = datetime.fromtimestamp(start).isoformat()
-        # Action/step item with duration
-        item = {
-            'id': step_id,
-            'group': root_name,
-            'subgroup': step_id,
-            'content': step_type,
-            'start': start_str,
-            'className': step_type,
-            'style': 'background-color: #FFCC66; border-color: #FFCC66;'
-        }
-        if end is not None:
-            item['end'] = datetime.fromtimestamp(end).isoformat()
-        items.append(item)
-        # tool calls as point items within this step subgroup
-        for idx, call in enumerate(step.get('tool_calls', []) or []):
-            func = call.get('function', {})
-            call_name = func.get('name', call.get('name', 'tool_call'))
-            call_id = f"{step_id}-call-{idx}"
-            # Tool call point item
-            call_item = {
-                'id': call_id,
-                'group': root_name,
-                'subgroup': step_id,
-                'content': f"🔧 {call_name}",
-                'start': start_str,
-                'type': 'point',
-                'className': 'tool_call',
-                'style': 'background-color: #FF9966; border-color: #FF9966;',
-                'title': json.dumps(call, indent=2)
-            }
-            items.append(call_item)
-    # Managed agents (same pattern)
-    for ma in provenance.get('managed_agents', {}).values():
-        name = ma.get('name')
-        if not name:
-            continue
-        ma_group: Dict = {'id': name, 'content': name, 'nestedGroups': []}
-        groups.append(ma_group)
-        for step in ma.get('steps', []):
-            seq = step.get('sequence')
-            step_type = step.get('type', '')
-            start = step.get('start_time')
-            end = step.get('end_time')
+    # One swimlane per agent (root first) with nested step subgroups
+    for agent in _iter_agents(provenance):
+        name = agent.name
+        agent_group: Dict = {'id': name, 'content': name, 'nestedGroups': []}
+        # Build this agent's rows locally and extend the results once per agent
+        agent_groups = [agent_group]
+        agent_items: List[Dict] = []
+        add_group = agent_groups.append
+        add_item = agent_items.append
+        add_nested = agent_group['nestedGroups'].append
+        for step in agent.steps:
+            seq, step_type, start, end = step.sequence, step.type or '', step.start_time, step.end_time
             if start is None:
                 continue
+            # define subgroup for this step
             step_id = f"{name}-step-{seq}"
-            ma_group['nestedGroups'].append(step_id)
-            groups.append({'id': step_id, 'content': f"Step {seq}: {step_type}"})
-            start_str = datetime.fromtimestamp(start).isoformat()
-            # Action/step item for managed agent
+            add_nested(step_id)
+            add_group({'id': step_id, 'content': f"Step {seq}: {step_type}"})
+            # vis-timeline takes epoch milliseconds, so skip datetime/ISO formatting
+            start_ms = int(start * 1000)
+            # Action/step item with duration
             item = {
                 'id': step_id,
                 'group': name,
                 'subgroup': step_id,
                 'content': step_type,
-                'start': start_str,
+                'start': start_ms,
                 'className': step_type,
                 'style': 'background-color: #FFCC66; border-color: #FFCC66;'
             }
             if end is not None:
-                item['end'] = datetime.fromtimestamp(end).isoformat()
-            items.append(item)
-            for idx, call in enumerate(step.get('tool_calls', []) or []):
-                func = call.get('function', {})
-                call_name = func.get('name', call.get('name', 'tool_call'))
-                call_id = f"{step_id}-call-{idx}"
-                # Tool call point item for managed agent
+                item['end'] = int(end * 1000)
+            add_item(item)
+            # tool calls as point items within this step subgroup
+            call_prefix = step_id + '-call-'
+            for idx, call in enumerate(step.tool_calls):
+                call_name = call.function.name or 'tool_call'
+                call_id = call_prefix + str(idx)
                 call_item = {
                     'id': call_id,
                     'group': name,
                     'subgroup': step_id,
                     'content': f"🔧 {call_name}",
-                    'start': start_str,
+                    'start': start_ms,
                     'type': 'point',
                     'className': 'tool_call',
                     'style': 'background-color: #FF9966; border-color: #FF9966;',
-                    'title': json.dumps(call, indent=2)
+                    # compact: vis-timeline renders the tooltip as HTML, which collapses the indentation anyway
+                    'title': orjson.dumps(call, default=str).decode()
                 }
-                items.append(call_item)
-    return groups, items
\ No newline at end of file
+                add_item(call_item)
+        groups.extend(agent_groups)
+        items.extend(agent_items)
+    return groups, items
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+jsonl_to_provenance.py
+
+Convert the per-step JSONL log written by main.py into the proof_of_work JSON
+layout ({'provenance': {'root_agent': ..., 'managed_agents': ...}}) read by
+build_knowledge_graph.py and viz_multi_view.py.
+
+Usage:
+  python jsonl_to_provenance.py output/proof_of_work_TIMESTAMP.jsonl [-o output.json]
+"""
+import os
+import argparse
+from typing import Dict, Iterable, Iterator
+
+import orjson
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """
+    Yield step records from a JSONL log, one per line.
+
+    A line that fails to parse (e.g. cut short by a crash mid-write) is skipped.
+    """
+    with open(path, 'rb') as f:
+        for lineno, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
+                print(f"Skipping malformed record on line {lineno}")
+
+
+def records_to_provenance(records: Iterable[Dict]) -> Dict:
+    """
+    Group step records by agent.
+
+    Args:
+        records: step dicts as written by main.py, each carrying an 'agent' key.
+
+    Returns:
+        Provenance dict; the first agent seen is the root agent and any
+        other agents become managed agents.
+    """
+    root = None
+    managed: Dict = {}
+    for rec in records:
+        name = rec.get('agent')
+        if root is None:
+            root = {'name': name, 'steps': []}
+        if name == root['name']:
+            agent = root
+        else:
+            agent = managed.setdefault(name, {'name': name, 'steps': []})
+        agent['steps'].append(rec)
+    return {'root_agent': root or {}, 'managed_agents': managed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert a proof_of_work JSONL log into provenance JSON.')
+    parser.add_argument('input_jsonl', help='Path to proof_of_work JSONL file')
+    parser.add_argument('-o', '--output', help='Output JSON file', default=None)
+    args = parser.parse_args()
+
+    provenance = records_to_provenance(read_records(args.input_jsonl))
+
+    out_path = args.output or f"{os.path.splitext(args.input_jsonl)[0]}.json"
+    with open(out_path, 'wb') as f:
+        f.write(orjson.dumps({'provenance': provenance}, default=str, option=orjson.OPT_INDENT_2))
+    print(f"Provenance written to {out_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,16 +4,79 @@ import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'smolagents-ref', 'src'))
 import requests
 import xml.etree.ElementTree as ET
-import json
-import re
+import time
+import itertools
+import queue
+import threading
+import orjson
 from smolagents import CodeAgent, tool, LiteLLMModel
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
-from datetime import date
-from proof_of_work import save_proof_of_work
+from urllib3.util.retry import Retry
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from html_to_markdown import html_to_markdown
+from prompt_toolkit import PromptSession
+from prompt_toolkit.patch_stdout import patch_stdout
+from step_record import StepRecord, ToolCall
 
 load_dotenv()
 
+# Upper bound on concurrent requests issued by visit_webpages
+MAX_PARALLEL_FETCHES = 8
+
+# One pooled session for all fetches so repeat visits to a host reuse the
+# TCP/TLS connection; transient failures are retried with backoff
+FETCH_TIMEOUT = (3, 30)  # (connect, read) seconds
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64,
+                       max_retries=Retry(total=3, backoff_factor=0.3))
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
+# Converted pages keyed by URL; kept at module scope so they survive across tasks.
+# Entries are served as-is for PAGE_CACHE_TTL seconds, then revalidated with a
+# conditional GET so an unchanged page costs a 304 and no re-conversion.
+PAGE_CACHE_TTL = 24 * 60 * 60
+_page_cache = {}
+
+
+def fetch_markdown(url: str) -> str:
+    """Fetch a webpage and convert it to Markdown, returning an error message on failure."""
+    cached = _page_cache.get(url)
+    if cached and time.time() - cached['fetched_at'] < PAGE_CACHE_TTL:
+        return cached['markdown']
+    try:
+        headers = {}
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        # Send a GET request to the URL
+        response = _session.get(url, headers=headers, timeout=FETCH_TIMEOUT)
+        if cached and response.status_code == 304:
+            cached['fetched_at'] = time.time()
+            return cached['markdown']
+        response.raise_for_status()  # Raise an exception for bad status codes
+
+        # Convert the HTML content to Markdown (also collapses multiple line breaks)
+        markdown_content = html_to_markdown(response.text)
+
+        _page_cache[url] = {
+            'fetched_at': time.time(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'markdown': markdown_content,
+        }
+        return markdown_content
+
+    except RequestException as e:
+        return f"Error fetching the webpage: {str(e)}"
+    except Exception as e:
+        return f"An unexpected error occurred: {str(e)}"
+
 
 @tool
 def visit_webpage(url: str) -> str:
@@ -25,25 +88,77 @@ def visit_webpage(url: str) -> str:
     Returns:
         The content of the webpage converted to Markdown, or an error message if the request fails.
     """
+    return fetch_markdown(url)
+
+
+@tool
+def visit_webpages(urls: list[str]) -> str:
+    """Visits several webpages concurrently and returns their contents as markdown.
+    Prefer this over repeated visit_webpage calls when you already know all the URLs.
+
+    Args:
+        urls: The URLs of the webpages to visit.
+
+    Returns:
+        The content of each webpage converted to Markdown, each preceded by a header with its URL.
+    """
+    if not urls:
+        return ""
+    # Fetches are network-bound, so overlapping them brings the total latency
+    # down to roughly that of the slowest page
+    with ThreadPoolExecutor(max_workers=min(len(urls), MAX_PARALLEL_FETCHES)) as pool:
+        pages = list(pool.map(fetch_markdown, urls))
+    return "\n\n".join(f"## {url}\n\n{page}" for url, page in zip(urls, pages))
+
+
+def cancel_tasks(agent, futures):
+    """Drop queued tasks and ask the agent to stop the run in progress."""
+    cancelled = sum(future.cancel() for future in futures)
+    if any(future.running() for future in futures):
+        agent.interrupt()
+        print("Interrupting the current task...")
+    if cancelled:
+        print(f"Cancelled {cancelled} queued task(s)")
+
+
+def wait_for_tasks(agent, futures):
+    """Block until outstanding tasks finish; Ctrl-C cancels them instead of waiting."""
+    remaining = [future for future in futures if not future.done()]
+    if not remaining:
+        return
+    print(f"Waiting for {len(remaining)} pending task(s)... (Ctrl-C to cancel)")
     try:
-        # Send a GET request to the URL
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for bad status codes
+        wait(remaining)
+    except KeyboardInterrupt:
+        cancel_tasks(agent, remaining)
+        # the running task stops at its next step once interrupted
+        wait(remaining)
 
-        # Convert the HTML content to Markdown - assuming a markdownify function exists
-        # You'll need to add the import for markdownify or implement the conversion
-        from markdownify import markdownify
-        markdown_content = markdownify(response.text).strip()
 
-        # Remove multiple line breaks
-        markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content)
+def start_proof_writer(path):
+    """
+    Append encoded JSONL lines to path from a background thread, so disk writes
+    never stall the agent loop.
 
-        return markdown_content
+    Returns:
+        The queue to put lines on (put None to stop) and the writer thread.
+    """
+    lines = queue.Queue()
 
-    except RequestException as e:
-        return f"Error fetching the webpage: {str(e)}"
-    except Exception as e:
-        return f"An unexpected error occurred: {str(e)}"
+    def drain():
+        with open(path, 'ab') as f:
+            while True:
+                line = lines.get()
+                if line is None:
+                    break
+                f.write(line)
+                # flush once per burst rather than once per line
+                if lines.empty():
+                    f.flush()
+
+    writer = threading.Thread(target=drain, name='proof-writer', daemon=True)
+    writer.start()
+    return lines, writer
 
 
 # -----------------------------------------------------------------------------
@@ -52,7 +167,7 @@ def visit_webpage(url: str) -> str:
 def main():
 
     # Set up the tools list for the agent.
-    tools = [visit_webpage]
+    tools = [visit_webpage, visit_webpages]
     
     # Initialize the agent with the chosen tools and a basic model.
     #model = HfApiModel()
@@ -68,43 +183,53 @@ def main():
     
     # Import step types for recording
     from smolagents.memory import TaskStep, PlanningStep, ActionStep, SystemPromptStep, FinalAnswerStep
-    import json
+
+    # The log spans every task in the session and agent.run resets memory per task,
+    # so steps are numbered session-wide to keep their ids unique in the log
+    seq_counter = itertools.count()
 
     def record_step(step, agent_obj):
-        # Convert a memory step to a dict for real-time provenance logging
+        # Convert a memory step to a StepRecord for real-time provenance logging
         agent_name = getattr(agent_obj, 'name', None) or getattr(agent_obj, 'agent_name', type(agent_obj).__name__)
-        seq = len(agent_obj.memory.steps) - 1
-        rec = {'agent': agent_name, 'sequence': seq}
+        seq = next(seq_counter)
         if isinstance(step, SystemPromptStep):
-            rec.update({'type': 'system_prompt', 'system_prompt': step.system_prompt})
-        elif isinstance(step, TaskStep):
-            rec.update({'type': 'task', 'task': step.task})
-        elif isinstance(step, PlanningStep):
-            rec.update({'type': 'planning', 'plan': step.plan})
-        elif isinstance(step, ActionStep):
-            calls = [tc.dict() for tc in (step.tool_calls or [])]
-            rec.update({
-                'type': 'action',
-                'step_number': step.step_number,
-                'model_output': step.model_output,
-                'tool_calls': calls,
-                'observations': step.observations,
-                'action_output': step.action_output,
-                'start_time': step.start_time,
-                'end_time': step.end_time,
-                'duration': step.duration,
-            })
-        elif isinstance(step, FinalAnswerStep):
-            rec.update({'type': 'final_answer', 'final_answer': step.final_answer})
-        else:
-            rec.update({'type': 'unknown'})
-        return rec
+            return StepRecord(agent_name, seq, 'system_prompt', system_prompt=step.system_prompt)
+        if isinstance(step, TaskStep):
+            return StepRecord(agent_name, seq, 'task', task=step.task)
+        if isinstance(step, PlanningStep):
+            return StepRecord(agent_name, seq, 'planning', plan=step.plan)
+        if isinstance(step, ActionStep):
+            return StepRecord(
+                agent_name, seq, 'action',
+                step_number=step.step_number,
+                model_output=step.model_output,
+                tool_calls=[ToolCall.from_dict(tc.dict()) for tc in (step.tool_calls or [])],
+                observations=step.observations,
+                action_output=step.action_output,
+                start_time=step.start_time,
+                end_time=step.end_time,
+                duration=step.duration,
+            )
+        if isinstance(step, FinalAnswerStep):
+            return StepRecord(agent_name, seq, 'final_answer', final_answer=step.final_answer)
+        return StepRecord(agent_name, seq, 'unknown')
 
-    # Interactive REPL via manager with real-time provenance
-    while True:
-        task = input("\nEnter task (or 'exit' to quit): ")
-        if task.lower() in ['exit', 'quit']:
-            break
+    # Append every step to a JSONL file as it happens: memory stays flat over long
+    # sessions and nothing is lost if the process dies. jsonl_to_provenance.py
+    # turns the log into the proof_of_work JSON the visualizers read.
+    output_dir = './output'
+    os.makedirs(output_dir, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    proof_path = os.path.join(output_dir, f"proof_of_work_{timestamp}.jsonl")
+
+    proof_lines, proof_writer = start_proof_writer(proof_path)
+
+    def emit(rec):
+        line = orjson.dumps(rec, default=str)
+        proof_lines.put(line + b"\n")
+        print(line.decode())
+
+    def run_task(task):
         print(f"Starting run for task: {task}")
         try:
             # Stream steps as they occur
@@ -112,17 +237,39 @@ def main():
             # Emit initial task step
             if agent.memory.steps:
                 initial = agent.memory.steps[0]
-                rec0 = record_step(initial, agent)
-                print(json.dumps(rec0, default=str))
+                emit(record_step(initial, agent))
             # Emit subsequent steps
             for step in stream:
-                rec = record_step(step, agent)
-                print(json.dumps(rec, default=str))
+                emit(record_step(step, agent))
         except Exception as e:
             print(f"Error during run: {e}")
 
-    # Save full provenance at end
-    saved_path = save_proof_of_work(agent, output_dir='./output')
-    print(f"Full proof of work written to {saved_path}")
+    # Interactive REPL via manager with real-time provenance
+    # Tasks run one at a time on a worker thread so the prompt stays usable while
+    # the agent works: new tasks queue up behind the current one, Ctrl-C cancels
+    # queued tasks and interrupts the running one, and 'exit' waits for the queue
+    # (Ctrl-C during that wait cancels it).
+    session = PromptSession()
+    pending = []
+    try:
+        with ThreadPoolExecutor(max_workers=1) as worker, patch_stdout():
+            while True:
+                try:
+                    task = session.prompt("\nEnter task (or 'exit' to quit): ")
+                except KeyboardInterrupt:
+                    cancel_tasks(agent, pending)
+                    continue
+                except EOFError:
+                    break
+                if task.lower() in ['exit', 'quit']:
+                    break
+                pending = [future for future in pending if not future.done()]
+                pending.append(worker.submit(run_task, task))
+            wait_for_tasks(agent, pending)
+    finally:
+        # Let the writer finish whatever is still queued
+        proof_lines.put(None)
+        proof_writer.join()
+    print(f"Proof of work steps written to {proof_path}")
 if __name__ == '__main__':
     main()
\ No newline at end of file
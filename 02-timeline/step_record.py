@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+step_record.py
+
+Typed records for agent provenance, shared by main.py (which produces them)
+and the graph and timeline builders (which consume them). Provenance is
+parsed into slotted dataclasses once, so each downstream pass reads plain
+attributes instead of repeating dict lookups. orjson serializes these
+dataclasses natively, in the same shape as the provenance JSON.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+# Shared fallback for calls without a 'function' entry, so misses don't allocate
+_EMPTY: dict = {}
+
+
+@dataclass(slots=True)
+class FunctionCall:
+    name: Optional[str] = None
+    arguments: Any = None
+
+
+@dataclass(slots=True)
+class ToolCall:
+    id: Optional[str] = None
+    type: Optional[str] = 'function'
+    function: FunctionCall = field(default_factory=FunctionCall)
+    # Explicit call output, when the framework records one ('output' or 'result')
+    output: Any = None
+
+    @classmethod
+    def from_dict(cls, call: Dict) -> 'ToolCall':
+        func = call.get('function') or _EMPTY
+        output = call.get('output')
+        if output is None:
+            output = call.get('result')
+        return cls(
+            id=call.get('id'),
+            type=call.get('type', 'function'),
+            function=FunctionCall(func.get('name', call.get('name')), func.get('arguments')),
+            output=output,
+        )
+
+
+@dataclass(slots=True)
+class StepRecord:
+    agent: Optional[str] = None
+    sequence: Optional[int] = None
+    type: Optional[str] = None
+    step_number: Optional[int] = None
+    system_prompt: Optional[str] = None
+    task: Optional[str] = None
+    plan: Optional[str] = None
+    model_output: Optional[str] = None
+    tool_calls: List[ToolCall] = field(default_factory=list)
+    observations: Any = None
+    action_output: Any = None
+    final_answer: Any = None
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+    duration: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, step: Dict) -> 'StepRecord':
+        _get = step.get
+        return cls(
+            agent=_get('agent'),
+            sequence=_get('sequence'),
+            type=_get('type'),
+            step_number=_get('step_number'),
+            system_prompt=_get('system_prompt'),
+            task=_get('task'),
+            plan=_get('plan'),
+            model_output=_get('model_output'),
+            tool_calls=[ToolCall.from_dict(call) for call in (_get('tool_calls') or ())],
+            observations=_get('observations'),
+            action_output=_get('action_output'),
+            final_answer=_get('final_answer'),
+            start_time=_get('start_time'),
+            end_time=_get('end_time'),
+            duration=_get('duration'),
+        )
+
+
+@dataclass(slots=True)
+class AgentRecord:
+    name: Optional[str] = None
+    class_name: Optional[str] = None
+    model: Optional[str] = None
+    steps: List[StepRecord] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, agent_info: Dict, default_name: Optional[str] = None) -> 'AgentRecord':
+        return cls(
+            name=agent_info.get('name', default_name),
+            class_name=agent_info.get('class'),
+            model=agent_info.get('model'),
+            steps=[StepRecord.from_dict(step) for step in agent_info.get('steps', [])],
+        )
+
+
+def load_agents(provenance: Dict) -> List[AgentRecord]:
+    """
+    Parse a provenance dict into agent records.
+
+    Args:
+        provenance: dict from proof_of_work JSON under 'provenance'.
+
+    Returns:
+        List of AgentRecord, root agent first, then managed agents.
+    """
+    agents = [AgentRecord.from_dict(provenance.get('root_agent', {}), default_name='root')]
+    agents.extend(AgentRecord.from_dict(ma) for ma in provenance.get('managed_agents', {}).values())
+    return agents
+
+
+def as_agents(provenance: Union[Dict, List[AgentRecord]]) -> List[AgentRecord]:
+    """Return agent records, parsing the provenance dict unless it was already loaded."""
+    return provenance if isinstance(provenance, list) else load_agents(provenance)
@@ -6,90 +6,59 @@ Generate a combined knowledge-graph + timeline + messages HTML visualization
 from a proof_of_work JSON provenance.
 
 Usage:
-  python viz_multi_view.py proof.json [-o output.html] [--title TITLE]
+  python viz_multi_view.py proof.json [-o output.html] [--title TITLE] [--external-data]
 """
 import os
-import json
+import re
+import hashlib
 import argparse
+
+import orjson
+import networkx as nx
+
 from build_knowledge_graph import build_graph
 from build_timeline_data import build_timeline_data
+from step_record import load_agents
 try:
     from pyvis.network import Network
 except ImportError:
     raise ImportError("pyvis is required to run this script: pip install pyvis")
+try:
+    from fa2_modified import ForceAtlas2
+except ImportError:
+    # Optional: Barnes-Hut ForceAtlas2 scales far better than spring_layout; fall back to NetworkX
+    ForceAtlas2 = None
 
-def main():
-    parser = argparse.ArgumentParser(
-        description='Visualize provenance with graph, timeline, and messages panes'
-    )
-    parser.add_argument('input_json', help='Path to proof_of_work JSON file')
-    parser.add_argument('-o', '--output', help='Output HTML file', default=None)
-    parser.add_argument('--title', help='Title for the visualization', default=None)
-    args = parser.parse_args()
-
-    # Load provenance JSON
-    with open(args.input_json, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    provenance = data.get('provenance', {})
-
-    # Build networkx graph and export to vis DataSets
-    G = build_graph(provenance)
-    net = Network(height='100%', width='100%', directed=True, notebook=False)
-    if args.title:
-        net.heading = args.title
-    net.from_nx(G)
-    # Export nodes & edges as lists of dicts
-    net_nodes = net.nodes
-    net_edges = net.edges
-
-    # Build timeline data (groups and items)
-    groups, items = build_timeline_data(provenance)
-
-    # Remove step subgroup rows under root agent but keep action/tool items
-    root_agent = provenance.get('root_agent', {}) or {}
-    root_name = root_agent.get('name')
-    if root_name:
-        # Filter out subgroup definitions for root agent steps
-        filtered_groups = []
-        for g in groups:
-            gid = g.get('id')
-            if gid == root_name:
-                # clear nestedGroups for root agent
-                if 'nestedGroups' in g:
-                    g['nestedGroups'] = []
-                filtered_groups.append(g)
-            elif not (isinstance(gid, str) and gid.startswith(f"{root_name}-step-")):
-                filtered_groups.append(g)
-        groups = filtered_groups
-        # Flatten items: move step and tool_call items to root swimlane
-        for it in items:
-            if it.get('group') == root_name and \
-               isinstance(it.get('subgroup'), str) and \
-               it['subgroup'].startswith(f"{root_name}-step-"):
-                # remove subgroup so item appears on root group
-                del it['subgroup']
+# Node background colors by provenance type; each type is a vis-network node group
+TYPE_COLORS = {
+    'agent': '#FF6666',
+    'tool': '#66FF66',
+    'tool_call': '#FF9966',
+    'observation': '#6666FF',
+    'action': '#FFCC66',
+    'step': '#CCCCCC',
+    'final_answer': '#CC66FF',
+}
 
-    # Serialize JSON blobs for embedding
-    net_nodes_json = json.dumps(net_nodes, indent=2)
-    net_edges_json = json.dumps(net_edges, indent=2)
-    groups_json = json.dumps(groups, indent=2)
-    items_json = json.dumps(items, indent=2)
+# Positions are computed here and scaled to [-LAYOUT_SCALE, LAYOUT_SCALE] pixels
+LAYOUT_SCALE = 1000
 
-    title = args.title or os.path.basename(args.input_json)
-    base = os.path.splitext(args.input_json)[0]
-    out_file = args.output or f"{base}_multi.html"
+# Computed layouts are cached here, keyed by a hash of the input file
+LAYOUT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'mechifact')
 
-    # Generate HTML with three-pane grid: graph | timeline | messages
-    html = f"""<!DOCTYPE html>
+# Three-pane page (graph | timeline | messages); @@name@@ marks where write_html
+# inserts the title or the code that hands the data to init()
+HTML_TEMPLATE = """<!DOCTYPE html>
 <html>
 <head>
-  <meta charset=\"utf-8\">
-  <title>{title}</title>
-  <script src=\"https://unpkg.com/vis-network/standalone/umd/vis-network.min.js\"></script>
-  <link href=\"https://unpkg.com/vis-timeline/styles/vis-timeline-graph2d.min.css\" rel=\"stylesheet\" />
-  <script src=\"https://unpkg.com/vis-timeline/standalone/umd/vis-timeline-graph2d.min.js\"></script>
+  <meta charset="utf-8">
+  <title>@@title@@</title>
+  <script src="https://unpkg.com/vis-network/standalone/umd/vis-network.min.js"></script>
+  <link href="https://unpkg.com/vis-timeline/styles/vis-timeline-graph2d.min.css" rel="stylesheet" />
+  <script src="https://unpkg.com/vis-timeline/standalone/umd/vis-timeline-graph2d.min.js"></script>
   <style>
-    body {{
+    body {
       margin: 0;
       font-family: Arial, sans-serif;
       display: grid;
@@ -99,173 +68,420 @@ def main():
         "controls controls"
         "main messages";
       height: 100vh;
-    }}
-    #controls {{
+    }
+    #controls {
       grid-area: controls;
       padding: 10px;
       border-bottom: 1px solid #ddd;
-    }}
-    #network, #timeline {{
+    }
+    #network, #timeline {
       grid-area: main;
       position: relative;
       width: 100%;   /* fill available grid column */
       height: 100%;  /* fill available grid row */
-    }}
-    #messages {{
+    }
+    #messages {
       grid-area: messages;
-      overflow-y: auto;
+      display: flex;
+      flex-direction: column;
+      min-height: 0;
       padding: 10px;
       box-sizing: border-box;
       border-left: 1px solid #ddd;
-    }}
-    .msg-box {{
-      padding: 8px;
-      margin-bottom: 8px;
+    }
+    #msg-list {
+      flex: 1;
+      min-height: 0;
+      overflow-y: auto;
+    }
+    /* fixed row height so the list can be windowed (see ITEM_HEIGHT below) */
+    .msg-box {
+      height: 32px;
+      padding: 6px 8px;
+      margin-bottom: 4px;
+      box-sizing: border-box;
       border: 1px solid #ccc;
       border-radius: 4px;
       cursor: pointer;
-    }}
-    .msg-box.active {{
+      white-space: nowrap;
+      overflow: hidden;
+      text-overflow: ellipsis;
+    }
+    .msg-box.active {
       background-color: #eef;
       border-color: #66a;
-    }}
-    /* hide message details by default, show when active */
-    .msg-box pre {{
+    }
+    /* details of the selected node, hidden until one is selected */
+    #msg-details {
       display: none;
+      flex: 0 1 auto;
+      max-height: 40%;
+      overflow-y: auto;
       background-color: #f9f9f9;
       padding: 8px;
-      margin-top: 4px;
+      margin-top: 8px;
       border-radius: 4px;
-    }}
-    .msg-box.active pre {{
-      display: block;
-    }}
-    pre {{
+    }
+    pre {
       margin: 0;
       white-space: pre-wrap;
       word-wrap: break-word;
-    }}
+    }
   </style>
 </head>
 <body>
-  <div id=\"controls\">
-    <label><input type=\"radio\" name=\"view\" value=\"graph\" checked> Knowledge Graph</label>
-    <label style=\"margin-left: 10px;\"><input type=\"radio\" name=\"view\" value=\"timeline\"> Timeline</label>
+  <div id="controls">
+    <label><input type="radio" name="view" value="graph" checked> Knowledge Graph</label>
+    <label style="margin-left: 10px;"><input type="radio" name="view" value="timeline"> Timeline</label>
+  </div>
+  <div id="network" style="width:100%; height:100%;"></div>
+  <div id="timeline" style="display: none; width:100%; height:100%;"></div>
+  <div id="messages">
+    <div id="msg-list"></div>
+    <pre id="msg-details"></pre>
   </div>
-  <div id=\"network\" style=\"width:100%; height:100%;\"></div>
-  <div id=\"timeline\" style=\"display: none; width:100%; height:100%;\"></div>
-  <div id=\"messages\"></div>
   <script>
   // view toggle logic using radio buttons
   var netDiv = document.getElementById('network');
   var timDiv = document.getElementById('timeline');
-  document.getElementsByName('view').forEach(function(radio) {{
-    radio.onchange = function() {{
-      if (this.value === 'graph') {{
+  document.getElementsByName('view').forEach(function(radio) {
+    radio.onchange = function() {
+      if (this.value === 'graph') {
         netDiv.style.display = 'block';
         timDiv.style.display = 'none';
         // redraw network when shown
-        if (typeof network !== 'undefined' && network.redraw) {{ network.redraw(); }}
-      }} else {{
+        if (typeof network !== 'undefined' && network.redraw) { network.redraw(); }
+      } else {
         netDiv.style.display = 'none';
         timDiv.style.display = 'block';
         // optional: redraw timeline
-        if (typeof timeline !== 'undefined' && timeline.redraw) {{ timeline.redraw(); }}
-      }}
-    }};
-  }});
-  // -- Knowledge Graph --
-  var graphData = {{
-    nodes: new vis.DataSet({net_nodes_json}),
-    edges: new vis.DataSet({net_edges_json})
-  }};
-  // apply color coding by node type (background colors)
-  var typeColors = {{
-    'agent': '#FF6666',
-    'tool': '#66FF66',
-    'tool_call': '#FF9966',
-    'observation': '#6666FF',
-    'action': '#FFCC66',
-    'step': '#CCCCCC',
-    'final_answer': '#CC66FF'
-  }};
-  // update node colors in the DataSet
-  graphData.nodes.get().forEach(function(node) {{
-    var c = typeColors[node.type];
-    if (c) {{
-      graphData.nodes.update({{ id: node.id, color: {{ background: c }} }});
-    }}
-  }});
-  var network = new vis.Network(
-    document.getElementById('network'),
-    graphData,
-    {{ interaction: {{ hover: true }}, edges: {{ arrows: {{ to: true }} }} }}
-  );
-  // ensure network knows its container size
-  network.setSize('100%', '100%');
-  network.redraw();
-  // redraw on window resize
-  window.addEventListener('resize', function() {{ network.redraw(); }});
-  // ensure initial redraw after page load
-  window.addEventListener('load', function() {{ if (network && network.redraw) network.redraw(); }});
-
-  // -- Timeline View --
-  var timelineGroups = new vis.DataSet({groups_json});
-  var timelineItems = new vis.DataSet({items_json});
-  var timelineOptions = {{
-    selectable: true,
-    showCurrentTime: false,
-    // enable nested step subgroups display
-    showNested: true
-  }};
-  var timeline = new vis.Timeline(
-    document.getElementById('timeline'),
-    timelineItems,
-    timelineGroups,
-    timelineOptions
-  );
-
-  // -- Messages Pane --
-  var allNodes = new vis.DataSet({net_nodes_json});
-  var messagesDiv = document.getElementById('messages');
-  // Create one clickable box per graph node
-  allNodes.forEach(node => {{
-    var b = document.createElement('div');
-    b.className = 'msg-box';
-    b.dataset.nodeId = node.id;
-    b.innerHTML = '<strong>' + (node.label || node.id) + '</strong>' + (node.title || '');
-    // attach hidden message details (JSON content)
-    var pre = document.createElement('pre');
-    pre.textContent = JSON.stringify(node, null, 2);
-    b.appendChild(pre);
-    b.onclick = () => {{
-      // highlight message box and show details
-      document.querySelectorAll('.msg-box.active').forEach(e => e.classList.remove('active'));
-      b.classList.add('active');
-      b.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-      // select node in graph
-      network.selectNodes([node.id]);
-      network.focus(node.id, {{ scale: 1.2 }});
-    }};
-    messagesDiv.appendChild(b);
-  }});
-  // Highlight message when a node is selected in the graph
-  network.on('selectNode', (params) => {{
-    var sel = params.nodes[0];
-    var el = document.querySelector('.msg-box[data-node-id="' + sel + '"]');
-    if (el) {{
-      document.querySelectorAll('.msg-box.active').forEach(e => e.classList.remove('active'));
-      el.classList.add('active');
-      el.scrollIntoView({{ behavior: 'smooth', block: 'center' }});
-    }}
-  }});
+        if (typeof timeline !== 'undefined' && timeline.redraw) { timeline.redraw(); }
+      }
+    };
+  });
+  // Graph and timeline are built once the data is available: init() is called
+  // with the data inline, or after fetching it from the --external-data file
+  var network, timeline;
+  function init(d) {
+    // -- Knowledge Graph --
+    var graphData = {
+      nodes: new vis.DataSet(d.nodes),
+      edges: new vis.DataSet(d.edges)
+    };
+    network = new vis.Network(
+      document.getElementById('network'),
+      graphData,
+      // nodes arrive pre-positioned, so the browser never runs the physics solver;
+      // colors come from the group styles rather than from each node
+      {
+        physics: { enabled: false },
+        interaction: { hover: true },
+        edges: { arrows: { to: true } },
+        groups: @@node_groups@@
+      }
+    );
+    // ensure network knows its container size
+    network.setSize('100%', '100%');
+    network.redraw();
+    // redraw on window resize
+    window.addEventListener('resize', function() { network.redraw(); });
+    // ensure initial redraw after page load
+    window.addEventListener('load', function() { if (network && network.redraw) network.redraw(); });
+
+    // -- Timeline View --
+    var timelineGroups = new vis.DataSet(d.groups);
+    var timelineItems = new vis.DataSet(d.items);
+    var timelineOptions = {
+      selectable: true,
+      showCurrentTime: false,
+      // enable nested step subgroups display
+      showNested: true
+    };
+    timeline = new vis.Timeline(
+      document.getElementById('timeline'),
+      timelineItems,
+      timelineGroups,
+      timelineOptions
+    );
+
+    // -- Messages Pane --
+    // Virtualized list: only the rows in view (plus some overscan) exist in the DOM,
+    // with spacers above and below sized so the scrollbar covers the full list.
+    // Rows share the graph's node DataSet rather than a second embedded copy.
+    var allNodes = graphData.nodes.get();
+    var nodeIndex = {};
+    allNodes.forEach((node, i) => { nodeIndex[node.id] = i; });
+    var ITEM_HEIGHT = 36;  // .msg-box height + margin-bottom
+    var OVERSCAN = 10;
+    var msgList = document.getElementById('msg-list');
+    var msgDetails = document.getElementById('msg-details');
+    var topSpacer = document.createElement('div');
+    var msgRows = document.createElement('div');
+    var bottomSpacer = document.createElement('div');
+    msgList.append(topSpacer, msgRows, bottomSpacer);
+    var activeId = null;
+    var windowStart = -1, windowEnd = -1;
+
+    function messageBox(node) {
+      var b = document.createElement('div');
+      b.className = node.id === activeId ? 'msg-box active' : 'msg-box';
+      var label = document.createElement('strong');
+      label.textContent = node.label || node.id;
+      b.appendChild(label);
+      if (node.title) {
+        b.appendChild(document.createTextNode(node.title));
+      }
+      b.onclick = () => {
+        // highlight message box and show details
+        selectMessage(node.id, false);
+        // select node in graph
+        network.selectNodes([node.id]);
+        network.focus(node.id, { scale: 1.2 });
+      };
+      return b;
+    }
+
+    function renderMessages(force) {
+      var start = Math.max(0, Math.floor(msgList.scrollTop / ITEM_HEIGHT) - OVERSCAN);
+      var end = Math.min(allNodes.length, start + Math.ceil(msgList.clientHeight / ITEM_HEIGHT) + 2 * OVERSCAN);
+      if (!force && start === windowStart && end === windowEnd) return;
+      windowStart = start;
+      windowEnd = end;
+      topSpacer.style.height = (start * ITEM_HEIGHT) + 'px';
+      bottomSpacer.style.height = ((allNodes.length - end) * ITEM_HEIGHT) + 'px';
+      var frag = document.createDocumentFragment();
+      for (var i = start; i < end; i++) {
+        frag.appendChild(messageBox(allNodes[i]));
+      }
+      msgRows.replaceChildren(frag);
+    }
+
+    function selectMessage(id, scroll) {
+      activeId = id;
+      msgDetails.textContent = JSON.stringify(allNodes[nodeIndex[id]], null, 2);
+      msgDetails.style.display = 'block';
+      if (scroll) {
+        // center the selected row; the window is re-rendered around it below
+        msgList.scrollTop = Math.max(0, nodeIndex[id] * ITEM_HEIGHT - (msgList.clientHeight - ITEM_HEIGHT) / 2);
+      }
+      renderMessages(true);
+    }
+
+    msgList.addEventListener('scroll', () => renderMessages(false), { passive: true });
+    window.addEventListener('resize', () => renderMessages(true));
+    renderMessages(true);
+    // Highlight message when a node is selected in the graph
+    network.on('selectNode', (params) => {
+      var sel = params.nodes[0];
+      if (sel in nodeIndex) {
+        selectMessage(sel, true);
+      }
+    });
+  }
+  @@data@@
   </script>
 </body>
 </html>"""
 
-    # Write out the combined HTML
-    with open(out_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+# Alternating static fragments and slot names; the node group styles never
+# change, so that slot is filled in once here
+_NODE_GROUPS = {node_type: {'color': {'background': color}} for node_type, color in TYPE_COLORS.items()}
+_TEMPLATE_PARTS = re.compile(r'@@(\w+)@@').split(
+    HTML_TEMPLATE.replace('@@node_groups@@', orjson.dumps(_NODE_GROUPS).decode('utf-8')))
+
+
+def dump_array(f, items, in_script: bool = False) -> None:
+    """
+    Write items to the binary file f as a JSON array, serializing one element at a time.
+
+    With in_script, '</' is escaped so text such as '</script>' inside the data
+    cannot end the enclosing <script> block early.
+    """
+    f.write(b'[')
+    for idx, item in enumerate(items):
+        if idx:
+            f.write(b',')
+        # utf-8 bytes straight from orjson: timeline items carry emoji and node text is arbitrary
+        encoded = orjson.dumps(item, default=str)
+        f.write(encoded.replace(b'</', b'<\\/') if in_script else encoded)
+    f.write(b']')
+
+
+def dump_data(f, data: dict, in_script: bool = False) -> None:
+    """Write a dict of lists to the binary file f as a JSON object, streaming each list."""
+    f.write(b'{')
+    for idx, (key, items) in enumerate(data.items()):
+        if idx:
+            f.write(b',')
+        f.write(orjson.dumps(key) + b':')
+        dump_array(f, items, in_script)
+    f.write(b'}')
+
+
+def write_html(path: str, title: str, data: dict, data_file: str = None) -> None:
+    """
+    Write the page, serializing the data straight into the open file.
+
+    Args:
+        path: output HTML path.
+        title: page title.
+        data: dict of 'nodes', 'edges', 'groups' and 'items' lists passed to init().
+        data_file: if given, the page fetches the data from this file (written
+            separately, see write_data) instead of embedding it.
+    """
+    with open(path, 'wb', buffering=1 << 20) as f:
+        for idx, part in enumerate(_TEMPLATE_PARTS):
+            if idx % 2 == 0:
+                f.write(part.encode('utf-8'))
+            elif part == 'title':
+                f.write(title.encode('utf-8'))
+            elif data_file:
+                src = orjson.dumps(os.path.basename(data_file)).decode('utf-8')
+                f.write((f"fetch({src}).then(r => r.json()).then(init)"
+                         f".catch(e => {{ document.getElementById('msg-list').textContent = "
+                         f"'Could not load ' + {src} + ': ' + e; }});").encode('utf-8'))
+            else:
+                f.write(b'init(')
+                dump_data(f, data, in_script=True)
+                f.write(b');')
+
+
+def write_data(path: str, data: dict) -> None:
+    """Write the page data as a JSON file for pages built with data_file."""
+    with open(path, 'wb', buffering=1 << 20) as f:
+        dump_data(f, data)
+
+
+def compute_layout(G: nx.DiGraph, scale: float = LAYOUT_SCALE) -> dict:
+    """
+    Compute a force-directed layout for G.
+
+    Returns:
+        Dict mapping each node id to an (x, y) tuple within [-scale, scale].
+    """
+    if len(G) == 0:
+        return {}
+    if ForceAtlas2 is not None:
+        # ForceAtlas2 expects a symmetric adjacency matrix
+        fa2 = ForceAtlas2(barnesHutOptimize=True, verbose=False)
+        pos = fa2.forceatlas2_networkx_layout(G.to_undirected(as_view=True), iterations=100)
+    else:
+        pos = nx.spring_layout(G, seed=42)
+    # Center and rescale so both backends produce the same pixel range
+    xs = [p[0] for p in pos.values()]
+    ys = [p[1] for p in pos.values()]
+    cx = (max(xs) + min(xs)) / 2
+    cy = (max(ys) + min(ys)) / 2
+    half_span = max(max(xs) - min(xs), max(ys) - min(ys)) / 2 or 1
+    factor = scale / half_span
+    return {n: (float((x - cx) * factor), float((y - cy) * factor)) for n, (x, y) in pos.items()}
+
+
+def cached_layout(G: nx.DiGraph, source: bytes, scale: float = LAYOUT_SCALE) -> dict:
+    """
+    Return compute_layout(G), reusing a cached result for identical input.
+
+    Args:
+        G: graph built from the input file.
+        source: raw bytes of the input file, used as the cache key.
+        scale: pixel range passed to compute_layout.
+    """
+    key = hashlib.blake2b(source, digest_size=16)
+    # Different backends or scales give different positions for the same input
+    key.update(f"{'fa2' if ForceAtlas2 is not None else 'spring'}:{scale}".encode())
+    path = os.path.join(LAYOUT_CACHE_DIR, f"layout_{key.hexdigest()}.json")
+    try:
+        with open(path, 'rb') as f:
+            pos = orjson.loads(f.read())
+        # Guard against a graph builder change producing different node ids
+        if pos.keys() == set(G):
+            return {n: tuple(xy) for n, xy in pos.items()}
+    except (OSError, orjson.JSONDecodeError):
+        pass
+    pos = compute_layout(G, scale)
+    try:
+        os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(pos))
+    except OSError as e:
+        print(f"Could not cache layout: {e}")
+    return pos
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Visualize provenance with graph, timeline, and messages panes'
+    )
+    parser.add_argument('input_json', help='Path to proof_of_work JSON file')
+    parser.add_argument('-o', '--output', help='Output HTML file', default=None)
+    parser.add_argument('--title', help='Title for the visualization', default=None)
+    parser.add_argument('--external-data', action='store_true',
+                        help='Write the data to <output>_data.json and fetch it from the page '
+                             'instead of embedding it (the page must then be served over HTTP)')
+    args = parser.parse_args()
+
+    # Load provenance JSON
+    with open(args.input_json, 'rb') as f:
+        source = f.read()
+    data = orjson.loads(source)
+    provenance = data.get('provenance', {})
+    # Parse the steps once; both the graph and the timeline read these records
+    agents = load_agents(provenance)
+
+    # Build networkx graph and export to vis DataSets
+    G = build_graph(agents)
+    net = Network(height='100%', width='100%', directed=True, notebook=False)
+    if args.title:
+        net.heading = args.title
+    net.from_nx(G)
+    # Export nodes & edges as lists of dicts
+    net_nodes = net.nodes
+    net_edges = net.edges
+    # Group and pin nodes here so the page builds its DataSet once, fully laid out
+    pos = cached_layout(G, source)
+    for node in net_nodes:
+        if node.get('type') in TYPE_COLORS:
+            # style via the type's group; pyvis's default per-node color would override it
+            node['group'] = node['type']
+            node.pop('color', None)
+        node['x'], node['y'] = pos[node['id']]
+        node['physics'] = False
+        node['fixed'] = True
+
+    # Build timeline data (groups and items)
+    groups, items = build_timeline_data(agents)
+
+    # Remove step subgroup rows under root agent but keep action/tool items
+    root_agent = provenance.get('root_agent', {}) or {}
+    root_name = root_agent.get('name')
+    if root_name:
+        prefix = f"{root_name}-step-"
+        # Drop subgroup definitions for root agent steps and clear its nestedGroups
+        groups = [
+            {**g, 'nestedGroups': []} if g.get('id') == root_name else g
+            for g in groups
+            if g.get('id') == root_name or not (isinstance(g.get('id'), str) and g['id'].startswith(prefix))
+        ]
+        # Flatten items: move step and tool_call items to root swimlane
+        for it in items:
+            if it.get('group') == root_name and isinstance(sg := it.get('subgroup'), str) and sg.startswith(prefix):
+                # remove subgroup so item appears on root group
+                del it['subgroup']
+
+    title = args.title or os.path.basename(args.input_json)
+    base = os.path.splitext(args.input_json)[0]
+    out_file = args.output or f"{base}_multi.html"
+
+    page_data = {'nodes': net_nodes, 'edges': net_edges, 'groups': groups, 'items': items}
+    data_file = None
+    if args.external_data:
+        data_file = f"{os.path.splitext(out_file)[0]}_data.json"
+        write_data(data_file, page_data)
+        print(f"Visualization data written to {data_file}")
+
+    # Stream the page to disk: static template fragments interleaved with the
+    # serialized data, so the full document never exists as one string
+    write_html(out_file, title, page_data, data_file)
     print(f"Multi-view visualization written to {out_file}")
 
 if __name__ == '__main__':
@@ -7,50 +7,149 @@ Start this script, then open http://localhost:8000 in your browser.
 """
 import os
 import time
-import json
+import hashlib
+import itertools
 import queue
 import threading
+import orjson
 from dotenv import load_dotenv
 from flask import Flask, Response, send_from_directory
+from werkzeug.serving import make_server
 from smolagents import CodeAgent, tool, LiteLLMModel
 import requests
 import re
+from markdownify import markdownify
+from selectolax.lexbor import LexborHTMLParser
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
 # Thread-safe queue to hold provenance events
 message_queue = queue.Queue()
 
+# Each SSE frame carries a JSON array of up to SSE_BATCH_SIZE events, gathered
+# for at most SSE_BATCH_WINDOW seconds after the first one
+SSE_BATCH_SIZE = 32
+SSE_BATCH_WINDOW = 0.05
+
+# One pooled session for all fetches so repeat visits to a host reuse the
+# TCP/TLS connection
+FETCH_TIMEOUT = 15  # seconds
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+_session.mount('http://', _adapter)
+_session.mount('https://', _adapter)
+
+# Runs of three or more newlines left over after conversion
+_BLANK_LINES = re.compile(r"\n{3,}")
+_SPACES = re.compile(r"[ \t\f\v]+")
+
+# Non-content elements dropped before extracting page text
+SKIP_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'iframe']
+
+# Elements set apart as blocks of their own and elements that start a new line,
+# even when the source has no whitespace between tags; table cells get a space
+BLOCK_TAGS = frozenset({'p', 'div', 'section', 'article', 'main', 'header', 'footer', 'nav', 'aside',
+                        'blockquote', 'pre', 'ul', 'ol', 'dl', 'table', 'figure', 'figcaption', 'hr',
+                        'h1', 'h2', 'h3', 'h4', 'h5', 'h6'})
+LINE_TAGS = frozenset({'li', 'tr', 'dt', 'dd'})
+CELL_TAGS = frozenset({'td', 'th'})
+
+def _collect_text(node, out):
+    for child in node.iter(include_text=True):
+        tag = child.tag
+        if tag == '-text':
+            out.append(child.text_content)
+        elif tag.startswith('-'):
+            # comments, doctype and other non-element nodes
+            continue
+        elif tag == 'br':
+            out.append("\n")
+        elif tag in LINE_TAGS:
+            out.append("\n")
+            _collect_text(child, out)
+        elif tag in BLOCK_TAGS:
+            out.append("\n")
+            _collect_text(child, out)
+            out.append("\n")
+        else:
+            _collect_text(child, out)
+            if tag in CELL_TAGS:
+                out.append(" ")
+
+def page_text(html: str) -> str:
+    """Extract the readable text of an HTML page with selectolax's Lexbor (C) parser."""
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(SKIP_TAGS)
+    root = tree.body or tree.root
+    if root is None:
+        return ""
+    parts = []
+    try:
+        _collect_text(root, parts)
+    except RecursionError:
+        # pathologically nested markup: fall back to the text with no block breaks
+        parts = [root.text(deep=True, separator=" ")]
+    # Tidy the whitespace within lines and collapse runs of blank lines
+    lines = (_SPACES.sub(" ", line).strip() for line in "".join(parts).splitlines())
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
 app = Flask(__name__, static_folder='static')
 
 @app.route('/')
 def index():
-    return send_from_directory(app.static_folder, 'index.html')
+    # Cached by the browser for five minutes (public, max-age=300); after that the
+    # conditional response answers revalidation with a 304
+    return send_from_directory(app.static_folder, 'index.html', max_age=300)
 
 @app.route('/events')
 def events():
     def event_stream():
+        # System prompts already sent on this connection, by hash: each page gets
+        # the full text once and a 'system_prompt_ref' it can resolve after that
+        sent_prompts = set()
         while True:
-            event = message_queue.get()
-            yield f"data: {json.dumps(event)}\n\n"
+            # Block for the first event, then coalesce whatever else arrives within
+            # a short window so bursts go out as one frame instead of many
+            batch = [message_queue.get()]
+            while len(batch) < SSE_BATCH_SIZE:
+                try:
+                    batch.append(message_queue.get(timeout=SSE_BATCH_WINDOW))
+                except queue.Empty:
+                    break
+            for idx, event in enumerate(batch):
+                if event.get('type') == 'system_prompt':
+                    if event['hash'] in sent_prompts:
+                        batch[idx] = {'agent': event['agent'], 'sequence': event['sequence'],
+                                      'type': 'system_prompt_ref', 'hash': event['hash']}
+                    else:
+                        sent_prompts.add(event['hash'])
+            yield b"data: " + orjson.dumps(batch, default=str) + b"\n\n"
     return Response(event_stream(), mimetype="text/event-stream")
 
-def start_server():
-    # Requires Flask installed (`pip install flask`)
-    app.run(host='0.0.0.0', port=8000, threaded=True)
+def start_server(host='0.0.0.0', port=8000):
+    """Bind the web server and serve it from a daemon thread; returns the server."""
+    # Requires Flask installed (`pip install flask`). The socket is bound before
+    # the thread starts, so the server accepts connections as soon as this returns
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
 
 @tool
-def visit_webpage(url: str) -> str:
-    """Visits a webpage and returns its Markdown content.
+def visit_webpage(url: str, markdown: bool = False) -> str:
+    """Visits a webpage and returns its text content.
     
     Args:
         url (str): The URL of the webpage to visit.
+        markdown (bool): Return Markdown (keeping links, headings and lists) instead of plain text.
+            Slower; only ask for it when the page structure matters.
     """
     try:
-        response = requests.get(url)
+        response = _session.get(url, timeout=FETCH_TIMEOUT)
         response.raise_for_status()
-        from markdownify import markdownify
+        if not markdown:
+            return page_text(response.text)
         markdown_content = markdownify(response.text).strip()
-        markdown_content = re.sub(r"\n{3,}", "\n\n", markdown_content)
+        markdown_content = _BLANK_LINES.sub("\n\n", markdown_content)
         return markdown_content
     except RequestException as e:
         return f"Error fetching the webpage: {e}"
@@ -61,9 +160,7 @@ def main():
     load_dotenv()
 
     # Start the server
-    server_thread = threading.Thread(target=start_server, daemon=True)
-    server_thread.start()
-    time.sleep(1)
+    server = start_server()
     print("Live server running at http://localhost:8000")
 
     # Initialize the agent
@@ -82,12 +179,12 @@ def main():
     # Import step types for recording
     from smolagents.memory import TaskStep, PlanningStep, ActionStep, SystemPromptStep, FinalAnswerStep
 
-    def record_step(step):
-        agent_name = getattr(agent, 'name', None) or getattr(agent, 'agent_name', type(agent).__name__)
-        seq = len(agent.memory.steps) - 1
+    def build_record(step, agent_name, seq):
         rec = {'agent': agent_name, 'sequence': seq}
         if isinstance(step, SystemPromptStep):
-            rec.update({'type': 'system_prompt', 'system_prompt': step.system_prompt})
+            # The hash lets each SSE connection send the text once (see event_stream)
+            digest = hashlib.sha1(step.system_prompt.encode('utf-8')).hexdigest()
+            rec.update({'type': 'system_prompt', 'system_prompt': step.system_prompt, 'hash': digest})
         elif isinstance(step, TaskStep):
             rec.update({'type': 'task', 'task': step.task})
         elif isinstance(step, PlanningStep):
@@ -108,7 +205,37 @@ def main():
             rec.update({'type': 'final_answer', 'final_answer': step.final_answer})
         else:
             rec.update({'type': 'unknown'})
-        message_queue.put(rec)
+        return rec
+
+    # Steps are turned into records on a worker thread so the agent loop only
+    # enqueues them. Every event goes through this one queue (step tuples and
+    # ready-made event dicts alike), so the page receives them in order.
+    internal_queue = queue.Queue()
+
+    def forward_events():
+        while True:
+            item = internal_queue.get()
+            if item is None:
+                break
+            if not isinstance(item, tuple):
+                message_queue.put(item)
+                continue
+            try:
+                message_queue.put(build_record(*item))
+            except Exception as e:
+                # report it like a failed run and keep forwarding later events
+                message_queue.put({'type': 'error', 'error': f"Could not record step: {e}"})
+
+    event_thread = threading.Thread(target=forward_events, daemon=True)
+    event_thread.start()
+
+    # Sequence numbers keep counting across tasks, so step ids stay unique on the page
+    seq_counter = itertools.count()
+
+    def record_step(step):
+        agent_name = getattr(agent, 'name', None) or getattr(agent, 'agent_name', type(agent).__name__)
+        seq = next(seq_counter)
+        internal_queue.put((step, agent_name, seq))
 
     # Interactive REPL
     while True:
@@ -116,7 +243,7 @@ def main():
         if task.lower() in ['exit', 'quit']:
             print("Shutting down.")
             break
-        message_queue.put({'type': 'task_start', 'task': task, 'timestamp': time.time()})
+        internal_queue.put({'type': 'task_start', 'task': task, 'timestamp': time.time()})
         try:
             stream = agent.run(task, stream=True)
             if agent.memory.steps:
@@ -124,11 +251,14 @@ def main():
             for step in stream:
                 record_step(step)
         except Exception as e:
-            message_queue.put({'type': 'error', 'error': str(e)})
+            internal_queue.put({'type': 'error', 'error': str(e)})
         finally:
-            message_queue.put({'type': 'task_end', 'task': task, 'timestamp': time.time()})
+            internal_queue.put({'type': 'task_end', 'task': task, 'timestamp': time.time()})
 
-    message_queue.put({'type': 'session_end', 'timestamp': time.time()})
+    internal_queue.put({'type': 'session_end', 'timestamp': time.time()})
+    internal_queue.put(None)
+    event_thread.join()
+    server.shutdown()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file